@@ -77,6 +77,28 @@ def get_or_create_product_id(
     return product_id, True
 
 
+def has_compact_prices(conn: sqlite3.Connection) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'price_days'"
+    ).fetchone()
+    return row is not None
+
+
+def price_stats(conn: sqlite3.Connection) -> tuple[str | None, int, int]:
+    """(max date, distinct days, total rows); compact DBs are read from price_days directly."""
+    if has_compact_prices(conn):
+        # `prices` gorunumu her satir icin tarih donusumu ve JOIN yapar; tabloyu dogrudan okuyoruz.
+        return conn.execute(
+            """
+            SELECT date(MAX(day) * 86400, 'unixepoch'), COUNT(DISTINCT day), COUNT(*)
+            FROM price_days
+            """
+        ).fetchone()
+    return conn.execute(
+        "SELECT MAX(date), COUNT(DISTINCT date), COUNT(*) FROM prices"
+    ).fetchone()
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Fill missing hal price days up to today using hal_api."
@@ -119,8 +141,7 @@ def main() -> int:
     ensure_categories(conn)
     product_cache = load_product_cache(conn)
 
-    cur = conn.execute("SELECT MAX(date) FROM prices")
-    max_date_str = cur.fetchone()[0]
+    max_date_str = price_stats(conn)[0]
 
     if args.start:
         start_date = datetime.strptime(args.start, "%Y-%m-%d").date()
@@ -236,9 +257,7 @@ def main() -> int:
 
         time.sleep(max(0.0, args.sleep))
 
-    max_after, distinct_days, total_rows = conn.execute(
-        "SELECT MAX(date), COUNT(DISTINCT date), COUNT(*) FROM prices"
-    ).fetchone()
+    max_after, distinct_days, total_rows = price_stats(conn)
     conn.close()
 
     print("[SUMMARY]")
@@ -3,9 +3,28 @@ from bs4 import BeautifulSoup
 from fastapi import FastAPI, HTTPException, Query
 from typing import List, Optional
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import contextvars
+import os
+import threading
 import uvicorn
 
-app = FastAPI(title="Ankara Hal Fiyatları API", description="Ankara Büyükşehir Belediyesi hal fiyatlarını çeken API")
+import hal_cache
+import hal_timing
+from hal_timing import span
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if CACHE_WARM_DAYS > 0:
+        # Sunucu açılışını bekletmemek için arka planda çalışır.
+        threading.Thread(target=warm_recent, args=(CACHE_WARM_DAYS,), daemon=True).start()
+    yield
+
+app = FastAPI(title="Ankara Hal Fiyatları API", description="Ankara Büyükşehir Belediyesi hal fiyatlarını çeken API", lifespan=lifespan)
+# Tüm endpoint'ler handler/serialize sürelerini ölçen route sınıfıyla eklenir.
+app.router.route_class = hal_timing.TimedRoute
+app.add_middleware(hal_timing.ServerTimingMiddleware)
 
 # Site artık type alanında metin değerleri bekliyor.
 # Geriye dönük uyumluluk için sayısal ve Türkçe değerleri eşliyoruz.
@@ -25,6 +44,30 @@ TYPE_MAP = {
     "balık": "fish",
 }
 
+# Toplu uç noktasında aynı anda yapılacak en fazla istek sayısı.
+MAX_BATCH_WORKERS = 8
+MAX_BATCH_DATES = 7
+
+# Geçmiş günlerin fiyatları değişmez; uzun süre yalnızca bunlar için kullanılır.
+# Bugün, gelecek günler ve boş sonuçlar (tablo henüz yayınlanmamış olabilir) kısa süre tutulur.
+CACHE_TTL = float(os.environ.get("HAL_CACHE_TTL", hal_cache.DEFAULT_TTL))
+CACHE_SHORT_TTL = float(os.environ.get("HAL_CACHE_SHORT_TTL", 600))
+CACHE_WARM_DAYS = int(os.environ.get("HAL_CACHE_WARM_DAYS", 0))
+ALL_TYPES = ["fruit", "vegetable", "imported", "fish"]
+
+# Önbellek ilk kullanımda oluşturulur; böylece `import hal_api` (örn. backfill_hal_api.py)
+# hal_cache.db dosyasını oluşturmaz.
+_result_cache: Optional[hal_cache.PriceCache] = None
+_result_cache_lock = threading.Lock()
+
+def get_result_cache() -> hal_cache.PriceCache:
+    global _result_cache
+    if _result_cache is None:
+        with _result_cache_lock:
+            if _result_cache is None:
+                _result_cache = hal_cache.cache_from_env()
+    return _result_cache
+
 def normalize_type(value: str) -> str:
     key = str(value).strip().lower()
     if key in TYPE_MAP:
@@ -51,53 +94,99 @@ def fetch_prices(date_str: str, product_type: str):
     try:
         # İlk istekte çerez almak için GET yapıyoruz
         session = requests.Session()
-        session.get(url, headers=headers)
+        with span("upstream_get"):
+            session.get(url, headers=headers)
         
         # Veriyi çekmek için POST yapıyoruz
-        response = session.post(url, data=payload, headers=headers)
+        with span("upstream_post"):
+            response = session.post(url, data=payload, headers=headers)
         if response.status_code != 200:
             return None
         
-        soup = BeautifulSoup(response.text, 'html.parser')
-        table = soup.find('table')
-        
-        if not table:
-            return []
-        
-        rows = []
-        # Tablo başlıklarını belirle
-        headers_list = [th.text.strip() for th in table.find_all('th')]
-        
-        for tr in table.find_all('tr')[1:]:
-            cells = [td.text.strip() for td in tr.find_all('td')]
-            if cells and len(cells) > 1:
-                item = {
-                    "urun_adi": cells[0],
-                    "urun_turu": cells[1],
-                    "birim": cells[2],
-                    "en_dusuk": cells[3],
-                    "en_yuksek": cells[4],
-                    "tarih": cells[5]
-                }
-                rows.append(item)
-            elif cells and "Kayıtlı veri bulunamadı" in cells[0]:
-                continue
+        with span("parse"):
+            soup = BeautifulSoup(response.text, 'html.parser')
+            table = soup.find('table')
+            
+            if not table:
+                return []
+            
+            rows = []
+            # Tablo başlıklarını belirle
+            headers_list = [th.text.strip() for th in table.find_all('th')]
+            
+            for tr in table.find_all('tr')[1:]:
+                cells = [td.text.strip() for td in tr.find_all('td')]
+                if cells and len(cells) > 1:
+                    item = {
+                        "urun_adi": cells[0],
+                        "urun_turu": cells[1],
+                        "birim": cells[2],
+                        "en_dusuk": cells[3],
+                        "en_yuksek": cells[4],
+                        "tarih": cells[5]
+                    }
+                    rows.append(item)
+                elif cells and "Kayıtlı veri bulunamadı" in cells[0]:
+                    continue
                 
         return rows
     except Exception as e:
         print(f"Hata: {e}")
         return None
 
+def cached_fetch_prices(date_str: str, product_type: str):
+    """
+    fetch_prices sonucunu önbellekten döndürür, yoksa çekip önbelleğe yazar.
+    Başarısız çekimler (None) ve ayrıştırılamayan tarihler önbelleğe yazılmaz.
+    """
+    try:
+        day = datetime.strptime(date_str, "%d.%m.%Y").date()
+    except ValueError:
+        return fetch_prices(date_str, product_type)
+    # 17.2.2026 ve 17.02.2026 aynı anahtara düşer.
+    date_str = day.strftime("%d.%m.%Y")
+    key = hal_cache.cache_key(date_str, product_type)
+    try:
+        with span("cache_get"):
+            cached = get_result_cache().get(key)
+    except Exception as e:
+        print(f"Önbellek hatası: {e}")
+        cached = None
+    if cached is not None:
+        return cached
+
+    data = fetch_prices(date_str, product_type)
+    if data is None:
+        return None
+
+    ttl = CACHE_TTL if data and day < datetime.now().date() else CACHE_SHORT_TTL
+    try:
+        with span("cache_set"):
+            get_result_cache().set(key, data, ttl)
+    except Exception as e:
+        print(f"Önbellek hatası: {e}")
+    return data
+
+def warm_recent(days: int, types: Optional[List[str]] = None):
+    """Son `days` günü (bugün dahil) önbelleğe önceden yükler."""
+    today = datetime.now()
+    dates = [(today - timedelta(days=i)).strftime("%d.%m.%Y") for i in range(days)]
+    return hal_cache.warm(get_result_cache(), cached_fetch_prices, dates, types or ALL_TYPES)
+
 @app.get("/fiyatlar")
 def get_prices(
     tarih: str = Query(..., description="Format: GG.AA.YYYY (Örn: 17.02.2026)"),
     tur: str = Query("2", description="1/2/3/4 veya fruit/vegetable/imported/fish")
 ):
+    try:
+        datetime.strptime(tarih, "%d.%m.%Y")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Geçersiz tarih formatı. GG.AA.YYYY kullanın.")
     try:
         normalized_type = normalize_type(tur)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    data = fetch_prices(tarih, normalized_type)
+    data = cached_fetch_prices(tarih, normalized_type)
     if data is None:
         raise HTTPException(status_code=500, detail="Veri çekilemedi")
     return {"tarih": tarih, "tur": normalized_type, "sonuclar": data}
@@ -126,12 +215,75 @@ def get_prices_range(
     current_dt = start_dt
     while current_dt <= end_dt:
         date_str = current_dt.strftime("%d.%m.%Y")
-        data = fetch_prices(date_str, normalized_type)
+        data = cached_fetch_prices(date_str, normalized_type)
         if data:
             all_results.extend(data)
         current_dt += timedelta(days=1)
         
     return {"baslangic": baslangic, "bitis": bitis, "tur": normalized_type, "toplam_kayit": len(all_results), "sonuclar": all_results}
 
+def split_multi(values: List[str]) -> List[str]:
+    """`tur=1&tur=2` ve `tur=1,2` biçimlerini tek listeye çevirir, sırayı koruyarak tekrarları atar."""
+    items = []
+    for value in values:
+        for part in value.split(","):
+            part = part.strip()
+            if part and part not in items:
+                items.append(part)
+    return items
+
+@app.get("/fiyatlar/toplu")
+def get_prices_batch(
+    tarih: List[str] = Query(..., description="Bir veya daha fazla tarih, GG.AA.YYYY (Örn: 17.02.2026,18.02.2026)"),
+    tur: List[str] = Query(["1,2,3,4"], description="Virgülle ayrılmış veya tekrarlanan 1/2/3/4 veya fruit/vegetable/imported/fish")
+):
+    # 17.2.2026 ve 17.02.2026 aynı gündür; tekrarları biçimlendirilmiş tarih üzerinden atıyoruz.
+    dates = []
+    for value in split_multi(tarih):
+        try:
+            date_str = datetime.strptime(value, "%d.%m.%Y").strftime("%d.%m.%Y")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Geçersiz tarih formatı. GG.AA.YYYY kullanın.")
+        if date_str not in dates:
+            dates.append(date_str)
+    if not dates:
+        raise HTTPException(status_code=400, detail="En az bir tarih verilmelidir.")
+    if len(dates) > MAX_BATCH_DATES:
+        raise HTTPException(status_code=400, detail=f"En fazla {MAX_BATCH_DATES} tarih istenebilir.")
+
+    try:
+        types = []
+        for value in split_multi(tur):
+            normalized_type = normalize_type(value)
+            if normalized_type not in types:
+                types.append(normalized_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not types:
+        raise HTTPException(status_code=400, detail="En az bir tür verilmelidir.")
+
+    jobs = [(date_str, type_slug) for type_slug in types for date_str in dates]
+    with ThreadPoolExecutor(max_workers=min(MAX_BATCH_WORKERS, len(jobs))) as executor:
+        # Span'ların isteğe yazılması için her iş, isteğin context'inde çalışır.
+        contexts = [contextvars.copy_context() for _ in jobs]
+        results = list(executor.map(lambda ctx, job: ctx.run(cached_fetch_prices, *job), contexts, jobs))
+
+    grouped = {}
+    for (date_str, type_slug), data in zip(jobs, results):
+        group = grouped.setdefault(type_slug, {"durum": "ok", "toplam_kayit": 0, "hatali_tarihler": [], "sonuclar": []})
+        if data is None:
+            group["hatali_tarihler"].append(date_str)
+            continue
+        group["sonuclar"].extend(data)
+        group["toplam_kayit"] += len(data)
+
+    for group in grouped.values():
+        if len(group["hatali_tarihler"]) == len(dates):
+            group["durum"] = "hata"
+        elif group["hatali_tarihler"]:
+            group["durum"] = "kismi"
+
+    return {"tarihler": dates, "turler": grouped}
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
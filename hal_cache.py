@@ -0,0 +1,249 @@
+"""Result cache for hal_api.fetch_prices, shared across workers and restarts."""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+Rows = List[Dict[str, str]]
+
+DEFAULT_PATH = str(Path(__file__).resolve().parent / "hal_cache.db")
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# LRU tahliyesi icin saniye hassasiyeti gerekmez; accessed_at en fazla bu siklikla yazilir.
+ACCESS_TOUCH_INTERVAL = 60
+
+
+def cache_key(date_str: str, product_type: str) -> str:
+    return f"{date_str}|{product_type}"
+
+
+class PriceCache(ABC):
+    """Ortak arayuz: `get` bulunamazsa veya suresi dolmussa None dondurur."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Rows]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, rows: Rows, ttl: float) -> None:
+        ...
+
+    def claim(self, key: str, lease: float) -> bool:
+        """Anahtari `lease` saniyeligine bu surece ayirir; baska biri tutuyorsa False doner.
+
+        Tek surecli arka uclarda her zaman True'dur.
+        """
+        return True
+
+    def release(self, key: str) -> None:
+        return None
+
+
+class NullCache(PriceCache):
+    def get(self, key: str) -> Optional[Rows]:
+        return None
+
+    def set(self, key: str, rows: Rows, ttl: float) -> None:
+        return None
+
+
+class MemoryCache(PriceCache):
+    """Tek surec icinde, en fazla `max_entries` kayit tutan onbellek."""
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self._data: Dict[str, Tuple[float, Rows]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Rows]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, rows = item
+            if expires_at <= time.time():
+                del self._data[key]
+                return None
+            return rows
+
+    def set(self, key: str, rows: Rows, ttl: float) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (time.time() + ttl, rows)
+            while len(self._data) > self.max_entries:
+                # dict ekleme sirasini korur; en eski kayit ilk siradadir.
+                del self._data[next(iter(self._data))]
+
+
+class SQLiteCache(PriceCache):
+    """Yerel SQLite dosyasinda tutulan, surecler arasi paylasilan onbellek.
+
+    WAL modu ve busy_timeout ile birden fazla uvicorn worker'i ayni dosyayi
+    kullanabilir. Toplam boyut `max_bytes` degerini asinca en uzun suredir
+    okunmayan kayitlar silinir. Her thread kendi baglantisini tekrar kullanir;
+    isabetler yalnizca okur, accessed_at ACCESS_TOUCH_INTERVAL'dan eskiyse yazilir.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS cache (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        expires_at REAL NOT NULL,
+                        accessed_at REAL NOT NULL
+                    )
+                    """
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache(accessed_at)")
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS leases (
+                        key TEXT PRIMARY KEY,
+                        expires_at REAL NOT NULL
+                    )
+                    """
+                )
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA busy_timeout=30000")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _thread_conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Rows]:
+        now = time.time()
+        conn = self._thread_conn()
+        # fetchall ifadeyi sonlandirir; okuma islemi (WAL anlik goruntusu) acik kalmaz.
+        rows = conn.execute(
+            "SELECT value, expires_at, accessed_at FROM cache WHERE key = ?", (key,)
+        ).fetchall()
+        if not rows:
+            return None
+        value, expires_at, accessed_at = rows[0]
+        if expires_at <= now:
+            with conn:
+                conn.execute("DELETE FROM cache WHERE key = ? AND expires_at <= ?", (key, now))
+            return None
+        if now - accessed_at >= ACCESS_TOUCH_INTERVAL:
+            with conn:
+                conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(value)
+
+    def set(self, key: str, rows: Rows, ttl: float) -> None:
+        now = time.time()
+        value = json.dumps(rows, ensure_ascii=False)
+        size = len(value.encode("utf-8"))
+        conn = self._thread_conn()
+        with conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO cache (key, value, size, expires_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (key, value, size, now + ttl, now),
+            )
+            self._evict(conn, now)
+
+    def claim(self, key: str, lease: float) -> bool:
+        now = time.time()
+        conn = self._thread_conn()
+        with conn:
+            # Coken bir surecin biraktigi suresi dolmus kira devralinabilir.
+            conn.execute("DELETE FROM leases WHERE key = ? AND expires_at <= ?", (key, now))
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO leases (key, expires_at) VALUES (?, ?)",
+                (key, now + lease),
+            )
+        return cur.rowcount == 1
+
+    def release(self, key: str) -> None:
+        conn = self._thread_conn()
+        with conn:
+            conn.execute("DELETE FROM leases WHERE key = ?", (key,))
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+        (total,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM cache ORDER BY accessed_at"):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM cache WHERE key = ?", victims)
+
+
+def cache_from_env() -> PriceCache:
+    """HAL_CACHE_BACKEND (sqlite/memory/none), HAL_CACHE_PATH, HAL_CACHE_MAX_BYTES."""
+    backend = os.environ.get("HAL_CACHE_BACKEND", "sqlite").strip().lower()
+    if backend == "none":
+        return NullCache()
+    if backend == "memory":
+        return MemoryCache()
+    if backend == "sqlite":
+        return SQLiteCache(
+            path=os.environ.get("HAL_CACHE_PATH", DEFAULT_PATH),
+            max_bytes=int(os.environ.get("HAL_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+        )
+    raise ValueError(f"Gecersiz HAL_CACHE_BACKEND: {backend}")
+
+
+def warm(
+    cache: PriceCache,
+    fetch: Callable[[str, str], Optional[Rows]],
+    dates: Iterable[str],
+    types: Iterable[str],
+    lease: float = 300,
+) -> Tuple[int, int, int, int]:
+    """Onbellekte olmayan (tarih, tur) ciftlerini cekip yazar.
+
+    Her anahtar once `claim` ile ayrilir; ayni anda isinan diger worker'lar o
+    anahtari atlar. (hit, filled, failed, skipped) dondurur.
+    """
+    hit = filled = failed = skipped = 0
+    for date_str in dates:
+        for product_type in types:
+            key = cache_key(date_str, product_type)
+            if cache.get(key) is not None:
+                hit += 1
+                continue
+            if not cache.claim(key, lease):
+                skipped += 1
+                continue
+            try:
+                rows = fetch(date_str, product_type)
+            finally:
+                cache.release(key)
+            if rows is None:
+                failed += 1
+            else:
+                filled += 1
+    return hit, filled, failed, skipped
@@ -0,0 +1,235 @@
+"""Per-request timing spans (Server-Timing) and opt-in cProfile capture for hal_api."""
+
+from __future__ import annotations
+
+import asyncio
+import cProfile
+import contextvars
+import functools
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Coroutine, Dict, Iterator, List, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+Spans = List[Tuple[str, float]]
+
+# Istek disinda (ornegin backfill_hal_api.py) None kalir; span() hicbir sey olcmez.
+_spans: contextvars.ContextVar[Optional[Spans]] = contextvars.ContextVar("hal_spans", default=None)
+_profile_path: contextvars.ContextVar[Optional[Path]] = contextvars.ContextVar(
+    "hal_profile_path", default=None
+)
+
+# HAL_TIMING=0 ile middleware ve route sarmalayicilari tamamen devre disi kalir;
+# start_request hic cagrilmaz ve span() bos gecer (profil cikarma da kapanir).
+TIMING_ENABLED = os.environ.get("HAL_TIMING", "1") != "0"
+PROFILE_DIR = os.environ.get("HAL_PROFILE_DIR")
+PROFILE_ALL = os.environ.get("HAL_PROFILE", "0") == "1"
+PROFILE_HEADER = "x-hal-profile"
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    spans = _spans.get()
+    if spans is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        spans.append((name, time.perf_counter() - started))
+
+
+# uvicorn'un LOGGING_CONFIG'i bu logger'i yapilandirmaz; kendi handler'ini ekliyoruz.
+# Kapatmak icin HAL_TIMING_LOG_LEVEL=WARNING.
+timing_logger = logging.getLogger("hal_api.timing")
+if not timing_logger.handlers:
+    _timing_handler = logging.StreamHandler()
+    _timing_handler.setFormatter(logging.Formatter("%(message)s"))
+    timing_logger.addHandler(_timing_handler)
+    timing_logger.setLevel(os.environ.get("HAL_TIMING_LOG_LEVEL", "INFO").upper())
+    timing_logger.propagate = False
+
+
+def profile_path_for(path: str, header_value: Optional[str]) -> Optional[Path]:
+    """HAL_PROFILE_DIR tanimliysa ve HAL_PROFILE=1 veya X-Hal-Profile: 1 ise dosya yolu dondurur."""
+    if not PROFILE_DIR:
+        return None
+    if not PROFILE_ALL and header_value != "1":
+        return None
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_") or "root"
+    return Path(PROFILE_DIR) / f"{time.time_ns()}-{slug}.prof"
+
+
+def server_timing_header(spans: Spans) -> str:
+    totals: Dict[str, Tuple[float, int]] = {}
+    for name, duration in spans:
+        total, count = totals.get(name, (0.0, 0))
+        totals[name] = (total + duration, count + 1)
+    parts = []
+    for name, (total, count) in totals.items():
+        entry = f"{name};dur={total * 1000:.1f}"
+        if count > 1:
+            entry += f';desc="x{count}"'
+        parts.append(entry)
+    return ", ".join(parts)
+
+
+def span_summary(spans: Spans) -> Dict[str, float]:
+    summary: Dict[str, float] = {}
+    for name, duration in spans:
+        summary[name] = round(summary.get(name, 0.0) + duration * 1000, 1)
+    return summary
+
+
+# Ayni anda tek profil alinir; Python 3.12+ cProfile (sys.monitoring) ikinci bir
+# profiler'i reddeder. Kilit alinamazsa istek profilsiz calisir.
+_profile_lock = threading.Lock()
+
+
+def _start_profile() -> Optional[cProfile.Profile]:
+    if _profile_path.get() is None or not _profile_lock.acquire(blocking=False):
+        return None
+    try:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+    except Exception as e:
+        _profile_lock.release()
+        print(f"Profil hatası: {e}")
+        return None
+
+
+def _stop_profile(profiler: Optional[cProfile.Profile]) -> None:
+    if profiler is None:
+        return
+    try:
+        profiler.disable()
+        path = _profile_path.get()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(str(path))
+    except Exception as e:
+        print(f"Profil hatası: {e}")
+    finally:
+        _profile_lock.release()
+
+
+def timed_endpoint(endpoint: Callable) -> Callable:
+    """Endpoint'i 'handler' olarak olcer; istenirse cProfile alir. Sync ve async endpoint'leri destekler."""
+
+    if asyncio.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            profiler = _start_profile()
+            try:
+                with span("handler"):
+                    return await endpoint(*args, **kwargs)
+            finally:
+                _stop_profile(profiler)
+
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        profiler = _start_profile()
+        try:
+            with span("handler"):
+                return endpoint(*args, **kwargs)
+        finally:
+            _stop_profile(profiler)
+
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """Endpoint'leri timed_endpoint ile saran route sinifi (HAL_TIMING=0 ise sarmaz).
+
+    Yanit FastAPI'nin kendi yolundan (response_model, status_code) uretilir;
+    'serialize' suresi, route isleyicisinin toplam suresinden 'handler'
+    cikarilarak bulunur ve parametre dogrulamasini da icerir.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs) -> None:
+        if TIMING_ENABLED:
+            endpoint = timed_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        route_handler = super().get_route_handler()
+        if not TIMING_ENABLED:
+            return route_handler
+
+        async def timed_route_handler(request: Request) -> Response:
+            spans = _spans.get()
+            if spans is None:
+                return await route_handler(request)
+            started = time.perf_counter()
+            before = len(spans)
+            response = await route_handler(request)
+            handler = sum(d for name, d in spans[before:] if name == "handler")
+            spans.append(("serialize", max(0.0, time.perf_counter() - started - handler)))
+            return response
+
+        return timed_route_handler
+
+
+class ServerTimingMiddleware:
+    """Span'lari toplayip `Server-Timing` basligi ve JSON log olarak yazan ASGI middleware.
+
+    BaseHTTPMiddleware yerine dogrudan ASGI: baslik, `send` sarmalanarak
+    http.response.start mesajina eklenir; istek/yanit nesnesi kurulmaz.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if not TIMING_ENABLED or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        header_value = None
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER.encode("latin-1"):
+                header_value = value.decode("latin-1")
+                break
+        profile_path = profile_path_for(scope["path"], header_value)
+        spans: Spans = []
+        spans_token = _spans.set(spans)
+        profile_token = _profile_path.set(profile_path)
+        started = time.perf_counter()
+        status = None
+
+        async def send_with_timing(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                spans.append(("total", time.perf_counter() - started))
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing_header(spans).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _spans.reset(spans_token)
+            _profile_path.reset(profile_token)
+
+        if timing_logger.isEnabledFor(logging.INFO):
+            timing_logger.info(json.dumps({
+                "path": scope["path"],
+                "query": scope["query_string"].decode("latin-1"),
+                "status": status,
+                "spans_ms": span_summary(spans),
+                "profile": str(profile_path) if profile_path else None,
+            }, ensure_ascii=False))
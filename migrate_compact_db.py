@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""Migrate hal_fiyatlari.db prices to a compact WITHOUT ROWID layout, in place."""
+
+from __future__ import annotations
+
+import argparse
+import shutil
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+COMPACT_SCHEMA = """
+CREATE TABLE price_days (
+    product_id INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    min_kurus INTEGER NOT NULL,
+    max_kurus INTEGER NOT NULL,
+    PRIMARY KEY (product_id, day)
+) WITHOUT ROWID;
+
+CREATE TABLE price_loads (
+    day INTEGER PRIMARY KEY,
+    loaded_at TEXT NOT NULL
+);
+"""
+
+# Eski `prices` tablosunun kolonlarini aynen donduren uyumluluk gorunumu.
+# Tam lira degerler eskisi gibi INTEGER, kuruslu degerler REAL olarak doner.
+# `id` saklanmaz; (day, product_id) anahtarindan turetilir.
+COMPAT_VIEWS = """
+CREATE VIEW IF NOT EXISTS prices AS
+SELECT
+    p.day * 65536 + p.product_id AS id,
+    p.product_id AS product_id,
+    CASE WHEN p.min_kurus % 100 = 0 THEN p.min_kurus / 100 ELSE p.min_kurus / 100.0 END AS min_price,
+    CASE WHEN p.max_kurus % 100 = 0 THEN p.max_kurus / 100 ELSE p.max_kurus / 100.0 END AS max_price,
+    date(p.day * 86400, 'unixepoch') AS date,
+    l.loaded_at AS created_at
+FROM price_days AS p
+LEFT JOIN price_loads AS l ON l.day = p.day;
+
+CREATE TRIGGER IF NOT EXISTS prices_insert INSTEAD OF INSERT ON prices
+BEGIN
+    INSERT OR REPLACE INTO price_days (product_id, day, min_kurus, max_kurus)
+    VALUES (
+        NEW.product_id,
+        CAST(julianday(NEW.date) - 2440587.5 AS INTEGER),
+        CAST(round(NEW.min_price * 100) AS INTEGER),
+        CAST(round(NEW.max_price * 100) AS INTEGER)
+    );
+    INSERT OR REPLACE INTO price_loads (day, loaded_at)
+    VALUES (
+        CAST(julianday(NEW.date) - 2440587.5 AS INTEGER),
+        COALESCE(NEW.created_at, CURRENT_TIMESTAMP)
+    );
+END;
+
+CREATE TRIGGER IF NOT EXISTS prices_update INSTEAD OF UPDATE ON prices
+BEGIN
+    DELETE FROM price_days
+    WHERE product_id = OLD.product_id
+      AND day = CAST(julianday(OLD.date) - 2440587.5 AS INTEGER);
+    INSERT OR REPLACE INTO price_days (product_id, day, min_kurus, max_kurus)
+    VALUES (
+        NEW.product_id,
+        CAST(julianday(NEW.date) - 2440587.5 AS INTEGER),
+        CAST(round(NEW.min_price * 100) AS INTEGER),
+        CAST(round(NEW.max_price * 100) AS INTEGER)
+    );
+    INSERT OR REPLACE INTO price_loads (day, loaded_at)
+    VALUES (
+        CAST(julianday(NEW.date) - 2440587.5 AS INTEGER),
+        COALESCE(NEW.created_at, CURRENT_TIMESTAMP)
+    );
+END;
+
+CREATE TRIGGER IF NOT EXISTS prices_delete INSTEAD OF DELETE ON prices
+BEGIN
+    DELETE FROM price_days
+    WHERE product_id = OLD.product_id
+      AND day = CAST(julianday(OLD.date) - 2440587.5 AS INTEGER);
+END;
+"""
+
+# Olcum icin kullanilan taramalar: tum tablo uzerinde toplam ve tek urun gecmisi.
+BENCH_QUERIES: Dict[str, Tuple[str, str]] = {
+    "full_scan": (
+        "SELECT COUNT(*), SUM(min_price), SUM(max_price) FROM prices",
+        "SELECT COUNT(*), SUM(min_kurus), SUM(max_kurus) FROM price_days",
+    ),
+    "product_history": (
+        "SELECT date, min_price, max_price FROM prices WHERE product_id = 1 ORDER BY date",
+        "SELECT day, min_kurus, max_kurus FROM price_days WHERE product_id = 1 ORDER BY day",
+    ),
+    "latest_day": (
+        "SELECT MAX(date) FROM prices",
+        "SELECT MAX(day) FROM price_days",
+    ),
+}
+
+
+def is_compact(conn: sqlite3.Connection) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'price_days'"
+    ).fetchone()
+    return row is not None
+
+
+def ensure_compat_views(conn: sqlite3.Connection) -> None:
+    """Create any missing compatibility view/trigger on an already compact DB."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for statement in _split_statements(COMPAT_VIEWS):
+            conn.execute(statement)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Move rows from the legacy `prices` table into `price_days`; return row count.
+
+    Already compact DBs only get missing compatibility triggers and return 0.
+    """
+    if is_compact(conn):
+        ensure_compat_views(conn)
+        return 0
+
+    (legacy_rows,) = conn.execute("SELECT COUNT(*) FROM prices").fetchone()
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for statement in _split_statements(COMPACT_SCHEMA):
+            conn.execute(statement)
+        conn.execute(
+            """
+            INSERT INTO price_days (product_id, day, min_kurus, max_kurus)
+            SELECT
+                product_id,
+                CAST(julianday(date) - 2440587.5 AS INTEGER),
+                CAST(round(min_price * 100) AS INTEGER),
+                CAST(round(max_price * 100) AS INTEGER)
+            FROM prices
+            """
+        )
+        conn.execute(
+            """
+            INSERT INTO price_loads (day, loaded_at)
+            SELECT CAST(julianday(date) - 2440587.5 AS INTEGER), MAX(created_at)
+            FROM prices
+            WHERE created_at IS NOT NULL
+            GROUP BY date
+            """
+        )
+        (moved_rows,) = conn.execute("SELECT COUNT(*) FROM price_days").fetchone()
+        if moved_rows != legacy_rows:
+            raise RuntimeError(
+                f"Satir sayisi tutmuyor: prices={legacy_rows} price_days={moved_rows}"
+            )
+        conn.execute("DROP TABLE prices")
+        conn.execute("DELETE FROM sqlite_sequence WHERE name = 'prices'")
+        for statement in _split_statements(COMPAT_VIEWS):
+            conn.execute(statement)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    conn.execute("VACUUM")
+    return moved_rows
+
+
+def _split_statements(script: str) -> List[str]:
+    statements: List[str] = []
+    buffer = ""
+    for line in script.splitlines(keepends=True):
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            if buffer.strip():
+                statements.append(buffer.strip())
+            buffer = ""
+    return statements
+
+
+def time_query(conn: sqlite3.Connection, sql: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        conn.execute(sql).fetchall()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def compare(db_path: Path, repeat: int, log: Callable[[str], None] = print) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = Path(tmp) / "legacy.db"
+        compact_path = Path(tmp) / "compact.db"
+        shutil.copyfile(db_path, legacy_path)
+        shutil.copyfile(db_path, compact_path)
+
+        legacy = sqlite3.connect(legacy_path, isolation_level=None)
+        legacy.execute("VACUUM")
+        compact = sqlite3.connect(compact_path, isolation_level=None)
+        if is_compact(compact):
+            raise SystemExit("DB zaten kompakt formatta; karsilastirma icin eski bir kopya kullanin.")
+        rows = migrate(compact)
+
+        legacy_size = legacy_path.stat().st_size
+        compact_size = compact_path.stat().st_size
+        log(f"[INFO] rows={rows}")
+        log(
+            f"[SIZE] legacy={legacy_size} compact={compact_size} "
+            f"ratio={compact_size / legacy_size:.2f}"
+        )
+
+        for name, (legacy_sql, compact_sql) in BENCH_QUERIES.items():
+            legacy_s = time_query(legacy, legacy_sql, repeat)
+            compact_s = time_query(compact, compact_sql, repeat)
+            view_s = time_query(compact, legacy_sql, repeat)
+            log(
+                f"[SCAN] {name} legacy={legacy_s * 1000:.2f}ms "
+                f"compact={compact_s * 1000:.2f}ms view={view_s * 1000:.2f}ms"
+            )
+
+        legacy.close()
+        compact.close()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Convert hal_fiyatlari.db prices to the compact WITHOUT ROWID layout."
+    )
+    parser.add_argument(
+        "--db",
+        default=str(Path(__file__).resolve().parent / "hal_fiyatlari.db"),
+        help="SQLite DB path",
+    )
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="Do not modify the DB; migrate a temp copy and report size/scan timings.",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=20, help="Timing repetitions per query (--compare)."
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    db_path = Path(args.db).resolve()
+
+    if args.compare:
+        compare(db_path, args.repeat)
+        return 0
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    if is_compact(conn):
+        ensure_compat_views(conn)
+        print(f"[INFO] {db_path} zaten kompakt formatta; uyumluluk tetikleyicileri guncellendi.")
+        conn.close()
+        return 0
+
+    size_before = db_path.stat().st_size
+    rows = migrate(conn)
+    conn.close()
+    size_after = db_path.stat().st_size
+
+    print(f"[OK] {db_path} rows={rows} size_before={size_before} size_after={size_after}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""Preload recent days into the shared hal_api result cache (e.g. before a deploy)."""
+
+from __future__ import annotations
+
+import argparse
+from typing import List
+
+import hal_api
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Warm the hal_api result cache with the most recent days."
+    )
+    parser.add_argument(
+        "--days", type=int, default=7, help="Number of days to preload, including today."
+    )
+    parser.add_argument(
+        "--types",
+        default="fruit,vegetable,imported,fish",
+        help="Comma separated types (fruit,vegetable,imported,fish).",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+
+    types: List[str] = []
+    for raw in (x.strip() for x in args.types.split(",")):
+        if not raw:
+            continue
+        normalized = hal_api.normalize_type(raw)
+        if normalized not in types:
+            types.append(normalized)
+
+    print(f"[INFO] cache={type(hal_api.get_result_cache()).__name__} days={args.days} types={','.join(types)}")
+    hit, filled, failed, skipped = hal_api.warm_recent(args.days, types)
+    print(f"[SUMMARY] hit={hit} filled={filled} failed={failed} skipped={skipped}")
+
+    return 0 if failed == 0 else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())